@@ -17,6 +17,8 @@ import cv2
 from google.cloud import firestore, pubsub_v1
 import RPi.GPIO as GPIO
 import subprocess
+from face_match import confidence_threshold, detect_face_gray, get_detector, \
+    match_confidence
 
 # Configuration
 PROJECT_DIR = "/home/raspberrypi/Projects"
@@ -25,6 +27,14 @@ IMAGE_DIR = os.path.join(DATA_DIR, "images")
 USERS_FILE = os.path.join(DATA_DIR, "authorized_users.json")
 LOG_DIR = os.path.join(PROJECT_DIR, "logs")
 LOG_FILE = os.path.join(LOG_DIR, "access.log")
+CAMERA_CACHE_FILE = os.path.join(DATA_DIR, "camera_backend.json")
+
+# Camera parameters
+CAMERA_FRAME_SIZE = (640, 480)
+CAMERA_REPROBE_INTERVAL = 3600  # seconds before re-probing the cached backend
+CAMERA_SETTLE_MS = 500  # libcamera AE/AWB settle time before the capture
+CAMERA_TIMEOUT = 10  # seconds before a hung libcamera process is killed
+CAMERA_BLANK_STD = 2.0  # frames flatter than this are treated as black/garbage
 
 # Pub/Sub setup (replace with your GCP project ID)
 PROJECT_ID = "iot-cloud-integrated-project"
@@ -42,16 +52,13 @@ KEYPAD_KEYS = [
     ["*","0","#","D"]
 ]
 
-# Face recognition parameters
-FACE_CONFIDENCE_THRESHOLD = 60.0
-face_cascade = cv2.CascadeClassifier(
-    cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-)
 LOG_COLLECTION = "access_logs"
 
 # Setup directories and services
 os.makedirs(LOG_DIR, exist_ok=True)
 db = firestore.Client()
+get_detector()  # fail at startup on a bad FACE_DETECTOR or missing model
+face_threshold = confidence_threshold()  # and on an engine with no calibrated threshold
 
 # GPIO setup
 GPIO.setmode(GPIO.BCM)
@@ -82,54 +89,97 @@ def get_pin_input(length=4):
     print()
     return pin
 
-# Detect face ROI in grayscale image
-def detect_face_gray(image):
-    faces = face_cascade.detectMultiScale(image, 1.1, 5)
-    if len(faces) == 0:
-        return None
-    x, y, w, h = faces[0]
-    return image[y:y+h, x:x+w]
-
-# Capture face ROI from camera with fallback methods
-def capture_face_gray():
-    # Try Picamera2 first
+# Camera backends: each grabs one grayscale frame, or returns None/raises
+def grab_picamera2():
+    from picamera2 import Picamera2
+    picam2 = Picamera2()
     try:
-        from picamera2 import Picamera2
-        picam2 = Picamera2()
-        cfg = picam2.create_still_configuration(main={"size":(640,480)})
+        cfg = picam2.create_still_configuration(main={"size":CAMERA_FRAME_SIZE})
         picam2.configure(cfg)
         picam2.start()
         time.sleep(0.1)
         frame = picam2.capture_array()
         picam2.stop()
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        face = detect_face_gray(gray)
-        if face is not None:
-            return face
-    except Exception:
-        pass
-    # Fallback to OpenCV VideoCapture
+    finally:
+        picam2.close()
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+def grab_videocapture():
     cap = cv2.VideoCapture(0, cv2.CAP_V4L2)
     if not cap.isOpened():
         cap = cv2.VideoCapture(0)
-    if cap.isOpened():
-        ret, frame = cap.read()
-        cap.release()
-        if ret:
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            face = detect_face_gray(gray)
-            if face is not None:
-                return face
-    # Final fallback: libcamera-jpeg
-    tmp = os.path.join(PROJECT_DIR, 'capture.jpg')
+    if not cap.isOpened():
+        return None
+    ret, frame = cap.read()
+    cap.release()
+    if not ret:
+        return None
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+def grab_libcamera():
+    # JPEG goes to stdout and is decoded in memory, no temp file
+    w, h = CAMERA_FRAME_SIZE
+    result = subprocess.run(
+        ["libcamera-jpeg", "-n", "-t", str(CAMERA_SETTLE_MS),
+         "--width", str(w), "--height", str(h), "-o", "-"],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True,
+        timeout=CAMERA_TIMEOUT
+    )
+    buf = np.frombuffer(result.stdout, dtype=np.uint8)
+    if buf.size == 0:
+        return None
+    return cv2.imdecode(buf, cv2.IMREAD_GRAYSCALE)
+
+CAMERA_BACKENDS = {
+    "picamera2": grab_picamera2,
+    "videocapture": grab_videocapture,
+    "libcamera": grab_libcamera,
+}
+
+# Remember the working camera backend between runs
+def load_camera_backend():
     try:
-        subprocess.run(["libcamera-jpeg","-o",tmp,"-n"], check=True)
-        img = cv2.imread(tmp, cv2.IMREAD_GRAYSCALE)
-        face = detect_face_gray(img)
+        with open(CAMERA_CACHE_FILE) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    name = cached.get("backend")
+    age = time.time() - cached.get("probed_at", 0)
+    if name not in CAMERA_BACKENDS or not 0 <= age < CAMERA_REPROBE_INTERVAL:
+        return None
+    return name
+
+def save_camera_backend(name):
+    try:
+        with open(CAMERA_CACHE_FILE, "w") as f:
+            json.dump({"backend": name, "probed_at": time.time()}, f)
+    except OSError as e:
+        print(f"Warning: Failed to save camera backend: {e}")
+
+# Grab a frame from one backend and return its face ROI, if any
+def grab_face(name):
+    try:
+        frame = CAMERA_BACKENDS[name]()
+    except Exception:
+        return None
+    if frame is None or frame.std() < CAMERA_BLANK_STD:
+        return None
+    return detect_face_gray(frame)
+
+# Capture face ROI from camera, probing backends in order only when needed
+def capture_face_gray():
+    cached = load_camera_backend()
+    if cached:
+        face = grab_face(cached)
         if face is not None:
             return face
-    except Exception:
-        pass
+    for name in CAMERA_BACKENDS:
+        if name == cached:
+            continue
+        face = grab_face(name)
+        if face is not None:
+            save_camera_backend(name)
+            return face
     return None
 
 # Log access attempts (local and Pub/Sub)
@@ -180,12 +230,10 @@ def main():
         return
 
     # LBPH matching
-    recognizer = cv2.face.LBPHFaceRecognizer_create()
-    recognizer.train([stored_face], np.array([0]))
-    _, conf = recognizer.predict(live_face)
+    conf = match_confidence(stored_face, live_face)
     print(f"DEBUG: confidence={conf:.2f}")
 
-    result = conf <= FACE_CONFIDENCE_THRESHOLD
+    result = conf <= face_threshold
     print("Access granted" if result else "Access denied")
     log_access(user['id'], pin, result)
 
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+detector_benchmark.py
+
+Compare face detector engines from face_match.py on the same image set:
+- Load every image in a directory as grayscale once
+- Run each engine over all images on a single CPU thread
+- Report detection rate and per-image latency (mean/p50/p95/max)
+"""
+import time
+import argparse
+import numpy as np
+import cv2
+from face_match import DETECTOR_ENGINES, detect_face_gray, get_detector, \
+    list_images
+
+# Load all images under a directory as grayscale
+def load_images(image_dir):
+    images = []
+    for path in list_images(image_dir, recursive=True):
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if img is not None:
+            images.append(img)
+    return images
+
+# Time one engine over all images, after a warm-up pass on the first image
+def bench_engine(name, images, repeats):
+    detector = get_detector(name)
+    detect_face_gray(images[0], detector)
+    latencies = []
+    detected = 0
+    for _ in range(repeats):
+        for img in images:
+            t0 = time.perf_counter()
+            face = detect_face_gray(img, detector)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            detected += face is not None
+    latencies = np.array(latencies)
+    return {
+        "rate": detected / len(latencies),
+        "mean": latencies.mean(),
+        "p50": np.percentile(latencies, 50),
+        "p95": np.percentile(latencies, 95),
+        "max": latencies.max(),
+    }
+
+# argparse type for counts that must be at least 1
+def positive_int(value):
+    try:
+        n = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected an integer, got {value!r}")
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {n}")
+    return n
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark face detector engines")
+    parser.add_argument("images", help="directory of test images (searched recursively)")
+    parser.add_argument("--engines", default=",".join(DETECTOR_ENGINES),
+                        help=f"comma-separated engines (default {','.join(DETECTOR_ENGINES)})")
+    parser.add_argument("--repeats", type=positive_int, default=3, help="passes over the image set")
+    parser.add_argument("--threads", type=int, default=1,
+                        help="OpenCV threads (default 1, like a busy Pi core)")
+    args = parser.parse_args()
+
+    cv2.setNumThreads(args.threads)
+    images = load_images(args.images)
+    if not images:
+        print(f"No images found in {args.images}")
+        return
+    print(f"{len(images)} images x {args.repeats} passes, {args.threads} OpenCV thread(s)")
+    print()
+    print(f"{'engine':>8} {'detected':>9} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for name in args.engines.split(","):
+        try:
+            r = bench_engine(name, images, args.repeats)
+        except (RuntimeError, ValueError, cv2.error) as e:
+            print(f"{name:>8} skipped: {e}")
+            continue
+        print(f"{name:>8} {r['rate']:>8.1%} {r['mean']:>8.2f} {r['p50']:>8.2f} "
+              f"{r['p95']:>8.2f} {r['max']:>8.2f}")
+
+if __name__ == "__main__":
+    main()
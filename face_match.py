@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+face_match.py
+
+Face detection and LBPH matching shared by access_control.py and the
+offline replay evaluator. Kept free of GPIO/cloud setup so it can be
+imported anywhere.
+"""
+import os
+import numpy as np
+import cv2
+
+# Face recognition parameters: LBPH accept threshold per detector engine.
+# Each engine crops faces differently, so an engine is only usable at the
+# door once replay_evaluator.py has calibrated a threshold for it here.
+FACE_CONFIDENCE_THRESHOLDS = {
+    "haar": 60.0,
+}
+
+# Face detector engine: "haar", "lbp" or "yunet" (override with FACE_DETECTOR)
+FACE_DETECTOR = os.environ.get("FACE_DETECTOR", "haar")
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+LBP_CASCADE_NAME = "lbpcascade_frontalface_improved.xml"
+LBP_CASCADE_DIRS = [
+    MODEL_DIR,
+    "/usr/share/opencv4/lbpcascades",
+    "/usr/local/share/opencv4/lbpcascades",
+]
+YUNET_MODEL = os.path.join(MODEL_DIR, "face_detection_yunet_2023mar.onnx")
+YUNET_SCORE_THRESHOLD = 0.8
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# List image files in a directory (optionally recursive), sorted for stable order
+def list_images(directory, recursive=False):
+    if not os.path.isdir(directory):
+        return []
+    if not recursive:
+        return sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.lower().endswith(IMAGE_EXTS)
+        )
+    return sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(directory) for name in files
+        if name.lower().endswith(IMAGE_EXTS)
+    )
+
+# Cascade detector (Haar or LBP): returns a list of (x, y, w, h) boxes
+class CascadeDetector:
+    def __init__(self, path):
+        self.cascade = cv2.CascadeClassifier(path)
+        if self.cascade.empty():
+            raise RuntimeError(f"Failed to load cascade: {path}")
+
+    def detect(self, gray):
+        return [tuple(int(v) for v in box)
+                for box in self.cascade.detectMultiScale(gray, 1.1, 5)]
+
+# OpenCV DNN YuNet detector on CPU, boxes sorted by score
+class YuNetDetector:
+    def __init__(self, path=YUNET_MODEL, score_threshold=YUNET_SCORE_THRESHOLD):
+        if not os.path.exists(path):
+            raise RuntimeError(f"YuNet model not found: {path}")
+        self.net = cv2.FaceDetectorYN.create(path, "", (320, 320), score_threshold)
+
+    def detect(self, gray):
+        h, w = gray.shape[:2]
+        self.net.setInputSize((w, h))
+        _, faces = self.net.detect(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR))
+        if faces is None:
+            return []
+        boxes = []
+        for face in sorted(faces, key=lambda f: -f[-1]):
+            x, y = max(int(face[0]), 0), max(int(face[1]), 0)
+            x2, y2 = min(int(face[0] + face[2]), w), min(int(face[1] + face[3]), h)
+            if x2 > x and y2 > y:
+                boxes.append((x, y, x2 - x, y2 - y))
+        return boxes
+
+def find_lbp_cascade():
+    for directory in LBP_CASCADE_DIRS:
+        path = os.path.join(directory, LBP_CASCADE_NAME)
+        if os.path.exists(path):
+            return path
+    raise RuntimeError(f"{LBP_CASCADE_NAME} not found in {LBP_CASCADE_DIRS}")
+
+DETECTOR_ENGINES = {
+    "haar": lambda: CascadeDetector(
+        cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'),
+    "lbp": lambda: CascadeDetector(find_lbp_cascade()),
+    "yunet": lambda: YuNetDetector(),
+}
+_detectors = {}
+
+# Build (once per process) and return the named detector engine
+def get_detector(name=None):
+    name = name or FACE_DETECTOR
+    if name not in DETECTOR_ENGINES:
+        raise ValueError(f"Unknown face detector {name!r}, expected one of {list(DETECTOR_ENGINES)}")
+    if name not in _detectors:
+        _detectors[name] = DETECTOR_ENGINES[name]()
+    return _detectors[name]
+
+# Accept threshold calibrated for the named detector engine
+def confidence_threshold(name=None):
+    name = name or FACE_DETECTOR
+    if name not in FACE_CONFIDENCE_THRESHOLDS:
+        raise RuntimeError(f"No calibrated confidence threshold for face detector {name!r}; "
+                           f"run replay_evaluator.py --detector {name} and add it to FACE_CONFIDENCE_THRESHOLDS")
+    return FACE_CONFIDENCE_THRESHOLDS[name]
+
+# Detect face ROI in grayscale image
+def detect_face_gray(image, detector=None):
+    faces = (detector or get_detector()).detect(image)
+    if len(faces) == 0:
+        return None
+    x, y, w, h = faces[0]
+    return image[y:y+h, x:x+w]
+
+# Train an LBPH recognizer on a single stored face
+def train_recognizer(stored_face):
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.train([stored_face], np.array([0]))
+    return recognizer
+
+# LBPH distance between stored and live face (lower is closer)
+def match_confidence(stored_face, live_face, recognizer=None):
+    if recognizer is None:
+        recognizer = train_recognizer(stored_face)
+    _, conf = recognizer.predict(live_face)
+    return conf
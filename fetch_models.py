@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+fetch_models.py
+
+Download and verify the detector model files used by face_match.py:
+- lbpcascade_frontalface_improved.xml (LBP cascade, OpenCV 4.10.0)
+- face_detection_yunet_2023mar.onnx (YuNet, OpenCV 4.10.0 test data)
+
+URLs and sha256 digests are pinned in MODELS. A file is only accepted
+when its digest matches the pinned one; a model with no pinned digest
+is refused, both when downloading and when checking a copy already
+placed in models/ by hand.
+"""
+import os
+import sys
+import hashlib
+import argparse
+import urllib.request
+from face_match import MODEL_DIR, LBP_CASCADE_NAME, YUNET_MODEL
+
+# name -> (pinned URL, pinned sha256; None until someone has verified the file)
+MODELS = {
+    LBP_CASCADE_NAME: (
+        "https://raw.githubusercontent.com/opencv/opencv/4.10.0/"
+        "data/lbpcascades/lbpcascade_frontalface_improved.xml",
+        None,
+    ),
+    os.path.basename(YUNET_MODEL): (
+        "https://raw.githubusercontent.com/opencv/opencv_extra/4.10.0/"
+        "testdata/dnn/onnx/models/yunet-202303.onnx",
+        None,
+    ),
+}
+DOWNLOAD_TIMEOUT = 60
+
+def sha256_of(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Raise unless the file matches the pinned digest
+def verify(name, path, expected):
+    actual = sha256_of(path)
+    if expected is None:
+        raise RuntimeError(f"No pinned sha256 for {name} (file hashes to {actual}); "
+                           f"verify it against the upstream release and pin it in MODELS")
+    if actual != expected:
+        raise RuntimeError(f"Checksum mismatch for {name}: expected {expected}, got {actual}")
+
+# Download one model to a temp file, verify it, then move it into place
+def fetch(name, url, expected):
+    dest = os.path.join(MODEL_DIR, name)
+    tmp = dest + ".part"
+    print(f"[*] {name} <- {url}")
+    try:
+        with urllib.request.urlopen(url, timeout=DOWNLOAD_TIMEOUT) as resp, open(tmp, "wb") as f:
+            while True:
+                chunk = resp.read(1 << 16)
+                if not chunk:
+                    break
+                f.write(chunk)
+        verify(name, tmp, expected)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, dest)
+    print(f"[+] Verified {name}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Download and verify face detector model files")
+    parser.add_argument("--force", action="store_true", help="re-download files already present")
+    args = parser.parse_args()
+
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    failed = False
+    for name, (url, expected) in MODELS.items():
+        dest = os.path.join(MODEL_DIR, name)
+        try:
+            if os.path.exists(dest) and not args.force:
+                verify(name, dest, expected)
+                print(f"[=] {name} already present and verified")
+            else:
+                fetch(name, url, expected)
+        except Exception as e:
+            print(f"[!] {name}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
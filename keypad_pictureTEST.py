@@ -15,6 +15,8 @@ ROW_PINS = [17, 27, 22, 5]
 COL_PINS = [23, 24, 25, 16]
 
 CORRECT_CODE = "1234"
+CAMERA_SETTLE_MS = 500  # libcamera AE/AWB settle time before the capture
+CAMERA_TIMEOUT = 15  # seconds before a hung libcamera-still is killed
 input_code = ""
 
 def setup():
@@ -36,9 +38,10 @@ def take_photo():
     filename = f"/home/raspberrypi/picture_{timestamp}.jpg"
     print("Taking photo...")
     try:
-        subprocess.run(["libcamera-still", "-o", filename], check=True)
+        subprocess.run(["libcamera-still", "-n", "-t", str(CAMERA_SETTLE_MS), "-o", filename],
+                       check=True, timeout=CAMERA_TIMEOUT)
         print(f"Photo saved to {filename}")
-    except subprocess.CalledProcessError:
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
         print("Failed to take photo. Is the camera enabled and working?")
     finally:
         cleanup_and_exit()
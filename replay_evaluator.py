@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+replay_evaluator.py
+
+Offline threshold calibration for the access control face check:
+- Load a labeled directory of enrolled images and live captures
+- Run the same detect_face_gray + LBPH pipeline as access_control.py
+  over every genuine and impostor pair in a process pool
+- Cache detected faces and pair scores so re-runs only redo what changed
+- Report ROC, FAR/FRR and throughput per threshold
+
+Dataset layout:
+    <dataset>/enrolled/<user_id>.jpg
+    <dataset>/live/<user_id>/<capture>.jpg
+"""
+import os
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import cv2
+from face_match import FACE_CONFIDENCE_THRESHOLDS, FACE_DETECTOR, \
+    DETECTOR_ENGINES, detect_face_gray, get_detector, list_images, \
+    match_confidence, train_recognizer
+
+CACHE_DIRNAME = ".replay_cache"
+SCORES_FILE = "scores.json"
+
+# Load enrolled images and live captures keyed by user id
+def load_dataset(dataset_dir):
+    enrolled = {}
+    for path in list_images(os.path.join(dataset_dir, "enrolled")):
+        user_id = os.path.splitext(os.path.basename(path))[0]
+        enrolled[user_id] = path
+    live = {}
+    live_dir = os.path.join(dataset_dir, "live")
+    if os.path.isdir(live_dir):
+        for user_id in sorted(os.listdir(live_dir)):
+            captures = list_images(os.path.join(live_dir, user_id))
+            if captures:
+                live[user_id] = captures
+    return enrolled, live
+
+# Build every (enrolled user, live user, live path) pair up front
+def build_pairs(enrolled, live):
+    pairs = []
+    for enrolled_id in enrolled:
+        for live_id, captures in live.items():
+            for path in captures:
+                pairs.append((enrolled_id, live_id, path))
+    return pairs
+
+# Cache key changes whenever the file content or detector is replaced
+def image_key(path, detector):
+    st = os.stat(path)
+    ident = f"{detector}|{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.sha1(ident.encode("utf-8")).hexdigest()
+
+def face_cache_path(cache_dir, key):
+    return os.path.join(cache_dir, "faces", key + ".npz")
+
+# Worker: detect face in one image and store the ROI in the cache
+def extract_face(task):
+    path, cache_file, detector = task
+    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    face = detect_face_gray(img, get_detector(detector)) if img is not None else None
+    # Write under a temp name so an interrupted run never leaves a truncated cache file
+    tmp = f"{cache_file[:-len('.npz')]}.{os.getpid()}.tmp.npz"
+    if face is None:
+        np.savez(tmp, found=False, face=np.zeros((0, 0), np.uint8))
+    else:
+        np.savez(tmp, found=True, face=face)
+    os.replace(tmp, cache_file)
+    return face is not None
+
+def load_face(cache_file):
+    with np.load(cache_file) as data:
+        return data["face"] if bool(data["found"]) else None
+
+# Worker: train once on an enrolled face, score all its live faces
+def score_enrolled(task):
+    enrolled_file, live_files = task
+    stored_face = load_face(enrolled_file)
+    scores = []
+    recognizer = train_recognizer(stored_face) if stored_face is not None else None
+    for live_file in live_files:
+        live_face = load_face(live_file)
+        if recognizer is None or live_face is None:
+            scores.append(None)
+        else:
+            scores.append(float(match_confidence(stored_face, live_face, recognizer)))
+    return scores
+
+# Detect faces for every image not already cached
+def extract_faces(paths, cache_dir, detector, pool):
+    os.makedirs(os.path.join(cache_dir, "faces"), exist_ok=True)
+    keys = {path: image_key(path, detector) for path in paths}
+    todo = [
+        (path, face_cache_path(cache_dir, key), detector)
+        for path, key in keys.items()
+        if not os.path.exists(face_cache_path(cache_dir, key))
+    ]
+    if todo:
+        list(pool.map(extract_face, todo, chunksize=8))
+    return keys, len(todo)
+
+def load_scores(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, SCORES_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_scores(cache_dir, scores):
+    tmp = os.path.join(cache_dir, SCORES_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(scores, f)
+    os.replace(tmp, os.path.join(cache_dir, SCORES_FILE))
+
+# Score every pair, reusing cached scores for unchanged image pairs
+def score_pairs(pairs, enrolled, keys, cache_dir, pool):
+    cached = load_scores(cache_dir)
+    pending = {}
+    for enrolled_id, _, live_path in pairs:
+        pair_key = keys[enrolled[enrolled_id]] + "|" + keys[live_path]
+        if pair_key not in cached:
+            pending.setdefault(enrolled_id, []).append(live_path)
+
+    tasks = []
+    for enrolled_id, live_paths in pending.items():
+        tasks.append((
+            face_cache_path(cache_dir, keys[enrolled[enrolled_id]]),
+            [face_cache_path(cache_dir, keys[p]) for p in live_paths],
+        ))
+    for (enrolled_id, live_paths), scores in zip(
+            pending.items(), pool.map(score_enrolled, tasks)):
+        for live_path, score in zip(live_paths, scores):
+            cached[keys[enrolled[enrolled_id]] + "|" + keys[live_path]] = score
+    if pending:
+        save_scores(cache_dir, cached)
+
+    results = []
+    for enrolled_id, live_id, live_path in pairs:
+        score = cached[keys[enrolled[enrolled_id]] + "|" + keys[live_path]]
+        results.append((enrolled_id == live_id, score))
+    return results, sum(len(v) for v in pending.values())
+
+# FAR/FRR at one threshold; a pair with no face counts as rejected
+def rates_at(results, threshold):
+    genuine = impostor = false_accept = false_reject = 0
+    for is_genuine, score in results:
+        accepted = score is not None and score <= threshold
+        if is_genuine:
+            genuine += 1
+            false_reject += not accepted
+        else:
+            impostor += 1
+            false_accept += accepted
+    far = false_accept / impostor if impostor else 0.0
+    frr = false_reject / genuine if genuine else 0.0
+    return far, frr
+
+# argparse type for --thresholds: "start:stop:step" -> sorted threshold list
+def parse_thresholds(spec):
+    try:
+        start, stop, step = (float(v) for v in spec.split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected start:stop:step, got {spec!r}")
+    if step <= 0 or start > stop:
+        raise argparse.ArgumentTypeError(f"need start <= stop and step > 0, got {spec!r}")
+    values = np.arange(start, stop + step / 2, step)
+    return sorted(set(round(float(v), 4) for v in values))
+
+def report(results, thresholds, current, timings):
+    genuine = sum(1 for g, _ in results if g)
+    impostor = len(results) - genuine
+    no_face = sum(1 for _, s in results if s is None)
+    print(f"Detector: {timings['detector']}")
+    print(f"Pairs: {len(results)} ({genuine} genuine, {impostor} impostor, "
+          f"{no_face} without a detected face)")
+    print(f"Faces extracted: {timings['faces']} in {timings['extract']:.2f}s")
+    rate = timings['scored'] / timings['score'] if timings['score'] > 0 else 0.0
+    print(f"Pairs scored: {timings['scored']} in {timings['score']:.2f}s "
+          f"({rate:.1f} pairs/s)")
+    print()
+    print(f"{'threshold':>10} {'FAR':>8} {'FRR':>8} {'TAR':>8}")
+    rows = []
+    best = None
+    for threshold in thresholds:
+        far, frr = rates_at(results, threshold)
+        rows.append({"threshold": threshold, "far": far, "frr": frr, "tar": 1 - frr})
+        marker = " *" if threshold == current else ""
+        print(f"{threshold:>10.2f} {far:>8.4f} {frr:>8.4f} {1 - frr:>8.4f}{marker}")
+        if best is None or abs(far - frr) < abs(best[1] - best[2]):
+            best = (threshold, far, frr)
+    print()
+    if current is None:
+        print(f"No calibrated threshold for {timings['detector']} in FACE_CONFIDENCE_THRESHOLDS yet")
+    else:
+        print(f"* current threshold for {timings['detector']} = {current}")
+    if best:
+        print(f"Closest to EER: threshold={best[0]:.2f} FAR={best[1]:.4f} FRR={best[2]:.4f}")
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay labeled captures to calibrate the face threshold")
+    parser.add_argument("dataset", help="directory with enrolled/ and live/<user_id>/")
+    parser.add_argument("--thresholds", type=parse_thresholds, default="20:120:5", help="start:stop:step (default 20:120:5)")
+    parser.add_argument("--detector", default=FACE_DETECTOR, choices=list(DETECTOR_ENGINES),
+                        help=f"face detector engine (default {FACE_DETECTOR})")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="process pool size")
+    parser.add_argument("--cache-dir", help=f"feature/score cache (default <dataset>/{CACHE_DIRNAME})")
+    parser.add_argument("--output", help="write ROC rows to this JSON file")
+    args = parser.parse_args()
+
+    get_detector(args.detector)  # fail fast if the engine's model is missing
+    cache_dir = args.cache_dir or os.path.join(args.dataset, CACHE_DIRNAME)
+    enrolled, live = load_dataset(args.dataset)
+    pairs = build_pairs(enrolled, live)
+    if not pairs:
+        print("No pairs found: expected enrolled/<user_id>.jpg and live/<user_id>/*.jpg")
+        return
+
+    paths = list(enrolled.values()) + [p for captures in live.values() for p in captures]
+    # One OpenCV thread per worker so the pool does not oversubscribe the CPU
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=cv2.setNumThreads,
+                             initargs=(1,)) as pool:
+        t0 = time.perf_counter()
+        keys, faces = extract_faces(paths, cache_dir, args.detector, pool)
+        t1 = time.perf_counter()
+        results, scored = score_pairs(pairs, enrolled, keys, cache_dir, pool)
+        t2 = time.perf_counter()
+
+    timings = {"detector": args.detector, "faces": faces, "extract": t1 - t0, "scored": scored, "score": t2 - t1}
+    current = FACE_CONFIDENCE_THRESHOLDS.get(args.detector)
+    thresholds = sorted(set(args.thresholds) | ({current} if current is not None else set()))
+    rows = report(results, thresholds, current, timings)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"ROC written to {args.output}")
+
+if __name__ == "__main__":
+    main()